@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+# run from a checkout without installing hashtray
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from hashtray.get_gravatar import Gravatar  # noqa: E402
+from stub_server import StubGravatar  # noqa: E402
+
+c = Console(highlight=False)
+
+
+def quiet_gravatar(account: str, url: str) -> Gravatar:
+    """
+    Gravatar instance pointing to the stub server, without the error messages.
+    """
+    gravatar = Gravatar(account=account, gravatar_url=url)
+    gravatar.rich = Console(quiet=True)
+    return gravatar
+
+
+async def bench_lookups(url: str, accounts: list, lookups: int, concurrency: int, sections: list) -> dict:
+    """
+    Run aggregate_gravatar_infos end-to-end against the stub server and measure lookups/sec.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    found = 0
+
+    async def lookup(account: str) -> None:
+        nonlocal found
+        async with semaphore:
+            start = time.perf_counter()
+            if await quiet_gravatar(account, url).aggregate_gravatar_infos(sections):
+                found += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(lookup(accounts[i % len(accounts)]) for i in range(lookups)))
+    elapsed = time.perf_counter() - start
+    return {
+        "elapsed": elapsed,
+        "rate": lookups / elapsed,
+        "found": found,
+        "p50": statistics.median(latencies),
+        "p95": statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0],
+    }
+
+
+async def bench_parse(url: str, accounts: list, rounds: int, sections: list) -> dict:
+    """
+    Measure the parse cost of the scrapped sections, the page being fetched once.
+    """
+    costs = {}
+    for account in accounts:
+        gravatar = quiet_gravatar(account, url)
+        # fetch and cache the page
+        await gravatar.scrap_account(sections)
+        timings = []
+        for _ in range(rounds):
+            gravatar.scrapped_infos = {}
+            start = time.perf_counter()
+            await gravatar.scrap_account(sections)
+            timings.append(time.perf_counter() - start)
+        costs[account] = statistics.mean(timings)
+    return costs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Gravatar lookups and parsing against a local stub server")
+    parser.add_argument("--lookups", type=int, default=200, help="Number of end-to-end lookups")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent lookups")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Stub server latency jitter in seconds")
+    parser.add_argument("--rate-limit", type=int, help="Stub server requests per second before 429")
+    parser.add_argument("--missing", type=int, default=1, help="Unknown accounts (404) per round of fixtures")
+    parser.add_argument("--parse-rounds", type=int, default=50, help="Rounds of parsing per fixture")
+    parser.add_argument(
+        "--sections",
+        choices=["enumeration", "all"],
+        default="all",
+        help="Scrapped sections to retrieve: the ones used by the enumeration, or all of them",
+    )
+    args = parser.parse_args()
+
+    sections = ["Verified accounts", "Links"] if args.sections == "enumeration" else None
+    stub = StubGravatar(latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit).start()
+    fixtures = sorted({name for name in stub.profiles if len(name) != 32 and len(name) != 64})
+    accounts = fixtures + [f"missing{i}" for i in range(args.missing)]
+
+    try:
+        lookups = asyncio.run(bench_lookups(stub.url, accounts, args.lookups, args.concurrency, sections))
+        # no latency nor rate limit for the parse cost
+        stub.latency, stub.jitter, stub.rate_limit = 0.0, 0.0, None
+        parse = asyncio.run(bench_parse(stub.url, fixtures, args.parse_rounds, sections))
+    finally:
+        stub.stop()
+
+    c.print(
+        f"[bold turquoise2]Lookups:[/bold turquoise2] {args.lookups} in {lookups['elapsed']:.2f}s "
+        f"- [bold]{lookups['rate']:.1f} lookups/sec[/bold] "
+        f"(concurrency {args.concurrency}, latency {args.latency}s, sections: {args.sections})\n"
+        f"Found: {lookups['found']} - latency p50 {lookups['p50'] * 1000:.1f}ms, p95 {lookups['p95'] * 1000:.1f}ms\n"
+        f"Stub responses: {stub.stats}\n"
+    )
+    table = Table(title="[b turquoise2]Parse cost[/b turquoise2]")
+    table.add_column("Fixture")
+    table.add_column("ms / profile", justify="right")
+    for account, cost in parse.items():
+        table.add_row(account, f"{cost * 1000:.3f}")
+    c.print(table)
+
+
+if __name__ == "__main__":
+    main()
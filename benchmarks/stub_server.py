@@ -0,0 +1,136 @@
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES = Path(Path(__file__).parent, "fixtures")
+
+
+class StubGravatar:
+    """
+    Local server mimicking Gravatar's /<hash or username>.json and profile pages, from recorded fixtures.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit: int = None,
+        fixtures: Path = FIXTURES,
+    ):
+        # seconds added to every response, +/- a random jitter
+        self.latency = latency
+        self.jitter = jitter
+        # max number of requests per second before answering 429
+        self.rate_limit = rate_limit
+        self.requests = deque()
+        self.lock = threading.Lock()
+        self.stats = {200: 0, 404: 0, 429: 0}
+        self.profiles = self.load_fixtures(fixtures)
+        self.server = ThreadingHTTPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @staticmethod
+    def load_fixtures(fixtures: Path) -> dict:
+        """
+        Index the json and html fixtures by username and hash, like Gravatar does.
+        """
+        profiles = {}
+        for json_file in sorted(fixtures.glob("*.json")):
+            data = json_file.read_bytes()
+            html = json_file.with_suffix(".html").read_bytes()
+            entry = json.loads(data)["entry"][0]
+            for key in [json_file.stem, entry["hash"]]:
+                profiles[key] = {"json": data, "html": html}
+        return profiles
+
+    def is_rate_limited(self) -> bool:
+        """
+        Sliding window of one second over all the requests.
+        """
+        if not self.rate_limit:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            while self.requests and now - self.requests[0] > 1:
+                self.requests.popleft()
+            if len(self.requests) >= self.rate_limit:
+                return True
+            self.requests.append(now)
+            return False
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if stub.latency or stub.jitter:
+                    time.sleep(max(0.0, stub.latency + random.uniform(-stub.jitter, stub.jitter)))
+                name = self.path.split("?")[0].strip("/")
+                is_json = name.endswith(".json")
+                profile = stub.profiles.get(name[:-5] if is_json else name)
+                if stub.is_rate_limited():
+                    self.reply(429, b"Too Many Requests", "text/plain")
+                elif profile is None:
+                    self.reply(404, b'"User not found"' if is_json else b"Not Found", "text/plain")
+                elif is_json:
+                    self.reply(200, profile["json"], "application/json")
+                else:
+                    self.reply(200, profile["html"], "text/html; charset=utf-8")
+
+            def reply(self, status: int, body: bytes, content_type: str):
+                with stub.lock:
+                    stub.stats[status] += 1
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # keep benchmarks output clean
+                pass
+
+        return Handler
+
+    def start(self) -> "StubGravatar":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Gravatar stub server serving recorded fixtures")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds around the latency")
+    parser.add_argument("--rate-limit", type=int, help="Requests per second before answering 429")
+    args = parser.parse_args()
+
+    stub = StubGravatar(args.host, args.port, args.latency, args.jitter, args.rate_limit)
+    print(f"Serving {len(stub.profiles) // 2} profiles on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
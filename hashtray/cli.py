@@ -1,12 +1,15 @@
 import argparse
 import asyncio
 import sys
+from pathlib import Path
 
 from rich.console import Console
 
 from hashtray.__about__ import __version__ as version
 from hashtray.enumerator import Enumerator
 from hashtray.get_gravatar import Gravatar
+from hashtray.mutator import Mutate
+from hashtray.stats import Statistics
 
 c = Console(highlight=False)
 
@@ -51,14 +54,92 @@ def parse_app_args(arguments=None):
         help="Use your custom email domains for emails generation",
         nargs="*",
     )
+    subp_account.add_argument(
+        "--domains-file",
+        "-f",
+        type=str,
+        help="Stream email domains from a large file (one domain per line, plain text or gzip)",
+    )
     subp_account.add_argument(
         "--crazy",
         "-c",
         help="Go crazy and try EVERY SINGLE combination (with any special char. at any place in the combinations)",
         action="store_true",
     )
+    subp_account.add_argument(
+        "--mask",
+        "-m",
+        type=Mutate.check_mask,
+        help="Append mask suffixes to the local parts (?d digit, ?l letter, ?s ._- , ?a letter or digit)",
+        nargs="*",
+    )
+    subp_account.add_argument(
+        "--years",
+        "-y",
+        type=Mutate.parse_years,
+        help="Append years (4 and 2 digits) to the local parts, e.g. 1970-2005",
+        nargs="*",
+    )
+    subp_account.add_argument(
+        "--no-provider-rules",
+        help="Don't apply the local part constraints of the big email providers (allowed characters, length)",
+        action="store_true",
+    )
+    subp_account.add_argument(
+        "--time-budget",
+        "-t",
+        type=float,
+        help="Stop the enumeration after this number of seconds and print a coverage report",
+    )
+    subp_account.add_argument(
+        "--max-candidates",
+        type=int,
+        help="Stop the enumeration after this number of candidates and print a coverage report",
+    )
+    subp_account.add_argument(
+        "--coverage-file",
+        type=str,
+        help="Save the searched part of each subspace to this file and continue from there on the next run "
+        "(needs --time-budget or --max-candidates)",
+    )
+    subp_account.add_argument(
+        "--leet",
+        help="Also try the leetspeak version of the local parts (a>4, e>3, i>1, o>0, s>5, t>7)",
+        action="store_true",
+    )
+    subp_account.add_argument(
+        "--stats",
+        type=str,
+        help="Order the search from the statistics of past matches and record the new ones "
+        f"(default file: {Statistics.default_path})",
+        nargs="?",
+        const=str(Statistics.default_path),
+    )
+
+    subp_stats = subparsers.add_parser(
+        "stats", help="Show, export or import the statistics of past matches"
+    )
+    subp_stats.add_argument(
+        "--file",
+        type=str,
+        help=f"Statistics file. Default: {Statistics.default_path}",
+    )
+    subp_stats.add_argument(
+        "--export",
+        type=str,
+        help="Export the statistics to this file",
+    )
+    subp_stats.add_argument(
+        "--import",
+        dest="import_file",
+        type=str,
+        help="Add the statistics of this file to yours",
+    )
 
-    return parser.parse_args(args=None if sys.argv[1:] else ["--help"])
+    args = parser.parse_args(args=None if sys.argv[1:] else ["--help"])
+    if args.cmd == "account" and args.coverage_file and args.time_budget is None and args.max_candidates is None:
+        parser.error("--coverage-file needs a budget: --time-budget or --max-candidates")
+    return args
 
 
 def main() -> None:
@@ -92,9 +173,32 @@ def main() -> None:
         "                       the ones found on the Gravatar profile.\n"
         "    [orange3]--domains, -d[/orange3]      [tan]domain1.com domain2.com ...[/tan]\n"
         "                       Use your custom email domains for emails generation\n"
+        "    [orange3]--domains-file, -f[/orange3] [tan]domains.txt|domains.txt.gz[/tan]\n"
+        "                       Stream email domains from a large file (one per line, plain text or gzip)\n"
         "    [orange3]--crazy, -c[/orange3]        Go crazy and try EVERY SINGLE combination\n"
         "                       (with any special character at any place in the combinations)\n"
-        "                       Half as fast per sec., gazillion combinations but exhaustive\n\n"
+        "                       Half as fast per sec., gazillion combinations but exhaustive\n"
+        "    [orange3]--mask, -m[/orange3]         [tan]?d?d ?d?d?d ...[/tan]\n"
+        "                       Append mask suffixes to the local parts\n"
+        "                       (?d digit, ?l letter, ?s ._- , ?a letter or digit, ?? for ?)\n"
+        "    [orange3]--years, -y[/orange3]        [tan]1970-2005 ...[/tan]\n"
+        "                       Append years (4 and 2 digits) to the local parts\n"
+        "    [orange3]--leet[/orange3]             Also try the leetspeak version of the local parts\n"
+        "    [orange3]--no-provider-rules[/orange3]\n"
+        "                       Don't skip the local parts a big provider doesn't allow\n"
+        "    [orange3]--time-budget, -t[/orange3]  [tan]seconds[/tan]\n"
+        "    [orange3]--max-candidates[/orange3]   [tan]number[/tan]\n"
+        "                       Search the cheapest subspaces first and stop when the budget is used up,\n"
+        "                       then print a coverage report\n"
+        "    [orange3]--coverage-file[/orange3]    [tan]coverage.json[/tan]\n"
+        "                       Save the searched part of each subspace and continue from there on the next run\n"
+        "                       (needs --time-budget or --max-candidates)\n"
+        "    [orange3]--stats[/orange3]            [tan]\\[stats.json][/tan]\n"
+        "                       Order the search from past matches and record the new ones\n\n"
+
+        ":arrow_forward: [bold turquoise2]Show, export or import the statistics of past matches:[/bold turquoise2]\n"
+        "  [bright_white]Usage:[/bright_white] [gold1]hashtray[/gold1] [orange_red1]stats[/orange_red1] "
+        "\\[--file stats.json] \\[--export shared.json] \\[--import shared.json]\n\n"
         "  [deep_sky_blue1]hashtray creates a list of possible email addresses using data from the Gravatar profile.\n"
         "  It compares each of these email hashes to the account hash to locate the primary Gravatar account email.[/deep_sky_blue1]\n"
         "  Additionally, it also checks emails in the public profile to see if they are the primary email.\n"
@@ -109,8 +213,30 @@ def main() -> None:
             domain_list=args.domain_list,
             strings=args.elements,
             custom_domains=args.domains,
+            domains_file=args.domains_file,
             crazy=args.crazy,
+            masks=args.mask,
+            years=args.years,
+            leet=args.leet,
+            time_budget=args.time_budget,
+            max_candidates=args.max_candidates,
+            coverage_file=args.coverage_file,
+            provider_rules=not args.no_provider_rules,
+            stats_file=args.stats,
         ).collect_elements())
+    elif args.cmd == "stats":
+        statistics = Statistics(args.file)
+        if args.import_file:
+            if not Path(args.import_file).is_file():
+                exit(f"[red]Statistics file not found: {args.import_file}[/red]")
+            new = statistics.merge(args.import_file)
+            statistics.save()
+            c.print(f"{new} new match(es) of {args.import_file} added to {statistics.path}")
+        if args.export:
+            statistics.save(args.export)
+            c.print(f"Statistics exported to {args.export}")
+        if not args.import_file and not args.export:
+            statistics.show(c)
     else:
         exit("[red]Invalid command.[/red]")
 
@@ -0,0 +1,134 @@
+import copy
+import gzip
+import hashlib
+import heapq
+import tempfile
+from pathlib import Path
+from typing import Any, Generator, Iterable
+
+
+class DomainsFile:
+    """
+    Class to handle a large list of email domains streamed from a plain text or gzip file.
+    The domains are deduped once on disk, with an external sort, so memory stays bounded.
+    """
+
+    # number of domains sorted in memory at once
+    chunk_size = 500_000
+
+    def __init__(self, path: str, exclude: Iterable[str] = None, track: Iterable[str] = None):
+        self.path = Path(path)
+        # domains already in the built-in or custom lists
+        self.exclude = set(exclude or [])
+        # domains to look for, like the ones with provider rules
+        self.track = set(track or [])
+        self.tracked = set()
+        # domains of the file added to the other domain lists since, skipped when streaming
+        self.skip = set()
+        # sorted and deduped copy of the file, removed with the instance
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="hashtray-")
+        self.cache = Path(self.tmp_dir.name, "domains.txt")
+        self.count = 0
+        # hash of the deduped domains, to tell two files apart
+        self.digest = None
+        self.prepare()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getstate__(self) -> dict:
+        # worker processes only read the deduped file, the temporary directory stays owned by the main process
+        state = self.__dict__.copy()
+        state["tmp_dir"] = None
+        return state
+
+    def __iter__(self) -> Generator[str, Any, None]:
+        with open(self.cache, "r", encoding="utf-8") as f:
+            for line in f:
+                if self.skip and line[:-1] in self.skip:
+                    continue
+                yield line[:-1]
+
+    def without(self, domains: Iterable[str]) -> "DomainsFile":
+        """
+        Return a view of the file without the given domains, added to the other domain lists after the dedupe.
+        The instance itself is left unchanged, a running search can keep streaming it.
+        """
+        candidates = set(domains) - self.exclude - self.skip
+        found = set()
+        if candidates:
+            with open(self.cache, "r", encoding="utf-8") as f:
+                found = {line[:-1] for line in f if line[:-1] in candidates}
+        view = copy.copy(self)
+        view.skip = self.skip | found
+        view.tracked = self.tracked - found
+        view.count = self.count - len(found)
+        return view
+
+    def open_source(self):
+        """
+        Open the domains file as text, decompressing it if it's gzipped.
+        """
+        with open(self.path, "rb") as f:
+            is_gzip = f.read(2) == b"\x1f\x8b"
+        if is_gzip:
+            return gzip.open(self.path, "rt", encoding="utf-8", errors="ignore")
+        return open(self.path, "r", encoding="utf-8", errors="ignore")
+
+    def read_domains(self) -> Generator[str, Any, None]:
+        """
+        Yield the cleaned domains of the file, skipping empty lines, comments and known domains.
+        """
+        with self.open_source() as f:
+            for line in f:
+                # first field only, zone files can hold more
+                fields = line.split()
+                if not fields or fields[0].startswith(("#", ";")):
+                    continue
+                # lowercase and remove the trailing dot of fully qualified names
+                domain = fields[0].lower().rstrip(".")
+                if domain and domain not in self.exclude:
+                    yield domain
+
+    def write_run(self, domains: list, index: int) -> Path:
+        """
+        Write a sorted and deduped run of domains to a temporary file.
+        """
+        run = Path(self.tmp_dir.name, f"run-{index}.txt")
+        with open(run, "w", encoding="utf-8") as f:
+            f.writelines(f"{domain}\n" for domain in sorted(set(domains)))
+        return run
+
+    def prepare(self) -> None:
+        """
+        Sort the file by runs, then merge the runs into a single deduped file and count its domains.
+        """
+        runs = []
+        domains = []
+        for domain in self.read_domains():
+            domains.append(domain)
+            if len(domains) >= self.chunk_size:
+                runs.append(self.write_run(domains, len(runs)))
+                domains = []
+        if domains or not runs:
+            runs.append(self.write_run(domains, len(runs)))
+
+        files = [open(run, "r", encoding="utf-8") for run in runs]
+        digest = hashlib.md5()
+        try:
+            previous = None
+            with open(self.cache, "w", encoding="utf-8") as cache:
+                for line in heapq.merge(*files):
+                    if line != previous:
+                        cache.write(line)
+                        digest.update(line.encode())
+                        self.count += 1
+                        previous = line
+                        if line[:-1] in self.track:
+                            self.tracked.add(line[:-1])
+            self.digest = digest.hexdigest()
+        finally:
+            for f in files:
+                f.close()
+            for run in runs:
+                run.unlink()
@@ -1,16 +1,27 @@
+import asyncio
 import hashlib
+import itertools
 import json
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterable
 
 import tldextract
 from rich.console import Console
 from rich.prompt import Confirm
+from rich.table import Table
 from tqdm import tqdm
 
+from hashtray.domains import DomainsFile
 from hashtray.get_elements import GetElements
 from hashtray.get_gravatar import Gravatar
+from hashtray.mutator import Mutate
 from hashtray.permutator import Permute
+from hashtray.planner import Planner
+from hashtray.providers import LocalPartRule
+from hashtray.stats import Statistics
 
 
 class Enumerator:
@@ -20,8 +31,18 @@ class Enumerator:
         strings: list = None,
         domain_list: str = None,
         custom_domains: list = None,
+        domains_file: str = None,
         crazy: bool = False,
+        masks: list = None,
+        years: list = None,
+        leet: bool = False,
+        time_budget: float = None,
+        max_candidates: int = None,
+        coverage_file: str = None,
+        provider_rules: bool = True,
+        stats_file: str = None,
     ):
+        self.rich = Console(highlight=False)
         self.account = account
         self.elements = strings
         self.chunks = []
@@ -38,15 +59,40 @@ class Enumerator:
         if custom_domains:
             # add custom domains
             self.domains = custom_domains + self.domains
-        self.len_domains = len(self.domains)
+        # local part constraints of the big providers
+        self.provider_rules = LocalPartRule.load_rules() if provider_rules else {}
+        # statistics of past matches, to order the search
+        self.statistics = Statistics(stats_file) if stats_file else None
+        # stream and dedupe large domain lists from disk
+        self.domains_file = self.load_domains_file(domains_file) if domains_file else None
+        self.count_domains()
+        # rules and masks applied to the local parts
+        self.mutator = Mutate(masks=masks, years=years, leet=leet)
         self.gravatar = None
         self.gravatar_instance = None
+        # only the scrapped sections used to collect elements and domains
+        self.profile_sections = ["Verified accounts", "Links"]
         self.n = 0
         self.elapsed = 0
         self.combination_count = 0
         self.info = {}
         self.hasher = None
-        self.rich = Console(highlight=False)
+        # permutator of the profile elements merged during the enumeration
+        self.delta_permute = None
+        self.profile_merged = False
+        # number of hashes between two event loop yields
+        self.yield_interval = 10_000
+        # execution plan and number of hashes between two progress bar updates
+        self.planner = None
+        self.progress_interval = 1
+        # time (seconds) and candidate budgets, the subspaces being searched cheapest first
+        self.time_budget = time_budget
+        self.max_candidates = max_candidates
+        self.budgeted = time_budget is not None or max_candidates is not None
+        self.coverage_file = coverage_file
+        self.deadline = None
+        self.out_of_budget = False
+        self.subspaces = []
 
     def load_domains(self) -> json:
         """
@@ -60,6 +106,22 @@ class Enumerator:
         ) as f:
             return json.load(f)
 
+    def load_domains_file(self, path: str) -> DomainsFile:
+        """
+        Load a large list of email domains from a file, deduped against the other domains.
+        """
+        if not Path(path).is_file():
+            self.rich.print(f"[red]Domains file not found: {path}[/red]\n")
+            exit()
+        with self.rich.status("Sorting and deduping the domains file...", spinner="dots", spinner_style="turquoise2"):
+            return DomainsFile(path, exclude=self.domains, track=self.provider_rules)
+
+    def count_domains(self) -> None:
+        """
+        Count the in-memory domains and the streamed ones.
+        """
+        self.len_domains = len(self.domains) + (len(self.domains_file) if self.domains_file else 0)
+
     @staticmethod
     def check_email(s: str) -> bool:
         """
@@ -166,6 +228,318 @@ class Enumerator:
         )
         exit()
 
+    def add_profile_elements(self) -> None:
+        """
+        Add public emails, elements and domains from the Gravatar profile.
+        """
+        self.get_public_emails()
+        profile_chunks, domains = GetElements(self.gravatar).get_elements()
+        for chunk in profile_chunks:
+            if chunk not in self.chunks:
+                self.chunks.append(chunk)
+        self.add_links_domains()
+        self.add_element_domains(domains)
+        if self.domains_file:
+            # don't stream the domains added to the list again
+            self.domains_file = self.domains_file.without(self.domains)
+        self.count_domains()
+
+    def add_user_elements(self) -> None:
+        """
+        Add user-provided elements to the chunks if not already present.
+        """
+        if self.elements:
+            for e in self.elements:
+                if e not in self.chunks:
+                    self.chunks.append(e)
+
+    def show_stats(self) -> None:
+        """
+        Print the enumeration stats.
+        """
+        self.rich.print(
+            f"Elements to permute: [gold3]{self.show_chunks()}[/gold3]\n"
+            f"Number of email domains: {self.len_domains}\n"
+            f"Number of suffixes per local part: {self.mutator.suffix_count}{' (+ leetspeak)' if self.mutator.leet else ''}\n"
+            f"Number of possible combinations: {self.combination_count}\n"
+        )
+
+    async def fetch_profile(self) -> dict | None:
+        """
+        Retrieve the Gravatar profile during the enumeration.
+        A failed retrieval is handled like a missing profile, so that the running search isn't lost.
+        """
+        try:
+            return await self.gravatar_instance.aggregate_gravatar_infos(self.profile_sections)
+        except Exception:
+            return None
+
+    def merge_profile(self, gravatar: dict | None, searched: Permute, progress: tqdm) -> None:
+        """
+        Merge the profile elements and domains fetched during the enumeration, and prepare
+        the search of the part of the space not covered by the running one.
+        Called as soon as the profile arrives and once the running search is over, merged only once.
+        """
+        if self.profile_merged:
+            return
+        self.profile_merged = True
+        self.gravatar = gravatar
+        if not self.gravatar:
+            # warn and continue with provided elements
+            progress.write(
+                f"No Gravatar account found for the provided hash: {self.account}. "
+                "Continuing with the provided elements to search for possible email addresses."
+            )
+            return
+        self.add_profile_elements()
+        self.schedule_elements()
+        self.delta_permute = Permute(
+            self.chunks, self.domains, self.crazy, self.mutator, self.domains_file, self.provider_rules
+        )
+        self.schedule(self.delta_permute)
+        self.delta_permute.exclude(searched)
+        delta_count = self.delta_permute.get_combination_count()
+        self.combination_count += delta_count
+        progress.total += delta_count
+        progress.refresh()
+        progress.write(
+            f"Gravatar profile retrieved. Elements to permute: {self.show_chunks()} - "
+            f"Number of email domains: {self.len_domains} - "
+            f"Number of possible combinations: {self.combination_count}"
+        )
+
+    async def compare_hashes(self, emails: Iterable[str], progress: tqdm) -> str | None:
+        """
+        Compare the hash of every generated email to the account hash.
+        Yield to the event loop regularly so that a pending profile retrieval can progress,
+        and stop when the time budget is used up.
+        """
+        i = 0
+        # number of emails already counted in the progress bar
+        flushed = 0
+        try:
+            for i, email in enumerate(emails, 1):
+                hashed = self.hasher(email)
+                if hashed == self.account_hash:
+                    # email matching the hash
+                    return email
+                if not i % self.progress_interval:
+                    progress.update(i - flushed)
+                    flushed = i
+                if not i % self.yield_interval:
+                    await asyncio.sleep(0)
+                    if self.deadline and time.monotonic() >= self.deadline:
+                        self.out_of_budget = True
+                        return None
+            return None
+        finally:
+            # number of emails compared
+            self.n += i
+            progress.update(i - flushed)
+
+    async def pool_search(self, permute: Permute, progress: tqdm) -> str | None:
+        """
+        Compare the hashes in worker processes, batch by batch.
+        The event loop stays free, so that a pending profile retrieval can progress.
+        """
+        loop = asyncio.get_running_loop()
+        found = None
+        pending = set()
+        with ProcessPoolExecutor(
+            max_workers=self.planner.workers,
+            initializer=init_worker,
+            initargs=(permute, self.account_hash, self.hash_type),
+        ) as executor:
+            batches = permute.get_batches(self.planner.batch_size)
+            while True:
+                # keep the workers busy with a bounded number of batches in flight
+                for batch in itertools.islice(batches, self.planner.workers * 2 - len(pending)):
+                    pending.add(loop.run_in_executor(executor, search_batch, batch))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    email, count = future.result()
+                    self.n += count
+                    progress.update(count)
+                    found = found or email
+                if found:
+                    # drop the batches not started yet
+                    for future in pending:
+                        future.cancel()
+                    break
+        return found
+
+    def schedule_elements(self) -> None:
+        """
+        Put the domains of past matches first, and the chunks of their most frequent shapes.
+        """
+        if self.statistics:
+            self.domains = self.statistics.order_domains(self.domains)
+            self.chunks = self.statistics.order_chunks(self.chunks)
+
+    def schedule(self, permute: Permute) -> None:
+        """
+        Order the separators and the numbers of chunks of a permutator from past matches.
+        """
+        if self.statistics:
+            permute.separators = self.statistics.order_separators(permute.separators)
+            permute.chunk_weights = self.statistics.get_chunk_weights()
+        self.separators = permute.separators
+
+    def learn(self, email: str) -> None:
+        """
+        Record a matching email in the statistics of past matches.
+        """
+        if self.statistics:
+            self.statistics.record(email, self.chunks, self.separators)
+            self.statistics.save()
+
+    def plan_search(self, permute: Permute, progress: tqdm = None) -> None:
+        """
+        Choose how to run the search of a permutator, reusing the hash rate measured for a previous one.
+        """
+        hash_rate = self.planner.hash_rate if self.planner else 0
+        self.planner = Planner(permute, self.hasher, self.account_hash, self.budgeted)
+        self.planner.hash_rate = hash_rate
+        self.planner.plan()
+        if progress:
+            # don't break the running progress bar
+            progress.write(self.planner.get_plan())
+        else:
+            self.rich.print(self.planner.get_plan() + "\n")
+        self.progress_interval = self.planner.progress_interval
+
+    async def search(self, permute: Permute, progress: tqdm) -> str | None:
+        """
+        Search the permutations as planned, in the main process or in worker processes.
+        """
+        if self.planner.mode == "process pool":
+            return await self.pool_search(permute, progress)
+        return await self.compare_hashes(permute.combinator(), progress)
+
+    @staticmethod
+    def subspace_key(subspace: dict) -> str:
+        """
+        Return the key identifying a subspace in the coverage file.
+        """
+        return f"{subspace['chunks']}/{subspace['domains']}/{subspace['separators']}"
+
+    def get_search_fingerprint(self) -> dict:
+        """
+        Return what defines the search space, to check a coverage file matches the current search.
+        """
+        return {
+            "hash": self.account_hash,
+            "chunks": self.chunks,
+            "domains": self.len_domains,
+            "crazy": self.crazy,
+            "suffixes": self.mutator.suffix_count,
+            "masks": self.mutator.masks,
+            "years": list(self.mutator.years),
+            "leet": self.mutator.leet,
+            "domains file": self.domains_file.digest if self.domains_file else None,
+            "provider rules": bool(self.provider_rules),
+            # the generation order within a subspace
+            "separators": self.separators,
+            "domains order": hashlib.md5("\n".join(self.domains).encode()).hexdigest(),
+        }
+
+    def load_coverage(self) -> dict:
+        """
+        Load the number of candidates searched per subspace by previous runs with the same search space.
+        """
+        if not self.coverage_file or not Path(self.coverage_file).is_file():
+            return {}
+        with open(self.coverage_file, "r") as f:
+            coverage = json.load(f)
+        if coverage.get("search") != self.get_search_fingerprint():
+            self.rich.print(
+                f"[orange3]The coverage file {self.coverage_file} is for another search space, it's ignored.[/orange3]\n"
+            )
+            return {}
+        return coverage.get("searched", {})
+
+    def save_coverage(self, subspaces: list) -> None:
+        """
+        Save the number of candidates searched per subspace, so that the next run can continue from there.
+        """
+        searched = {
+            self.subspace_key(subspace): subspace["searched"]
+            for subspace in subspaces
+            if subspace["searched"]
+        }
+        with open(self.coverage_file, "w") as f:
+            json.dump({"search": self.get_search_fingerprint(), "searched": searched}, f, indent=4)
+
+    async def budgeted_search(self, permute: Permute, progress: tqdm) -> str | None:
+        """
+        Search the subspaces in order of increasing cost until the time or candidate budget is used up.
+        """
+        self.deadline = time.monotonic() + self.time_budget if self.time_budget else None
+        previous = self.load_coverage()
+        self.subspaces = permute.get_subspaces()
+        found = None
+        for subspace in self.subspaces:
+            # candidates already searched by previous runs
+            subspace["searched"] = min(previous.get(self.subspace_key(subspace), 0), subspace["count"])
+            progress.update(subspace["searched"])
+            if subspace["searched"] == subspace["count"]:
+                # fully searched by a previous run
+                subspace["status"] = "previous run"
+                continue
+            if (
+                found
+                or self.out_of_budget
+                or (self.deadline and time.monotonic() >= self.deadline)
+                or (self.max_candidates is not None and self.n >= self.max_candidates)
+            ):
+                self.out_of_budget = self.out_of_budget or not found
+                subspace["status"] = "partial" if subspace["searched"] else "not started"
+                continue
+            # continue where a previous run stopped
+            emails = itertools.islice(permute.subspace_combinator(subspace), subspace["searched"], None)
+            if self.max_candidates is not None:
+                # stop exactly at the candidate budget
+                emails = itertools.islice(emails, max(self.max_candidates - self.n, 0))
+            start = self.n
+            found = await self.compare_hashes(emails, progress)
+            subspace["searched"] += self.n - start
+            if subspace["searched"] == subspace["count"] and not found:
+                subspace["status"] = "complete"
+            else:
+                subspace["status"] = "match" if found else "partial"
+                self.out_of_budget = not found
+        return found
+
+    def show_coverage(self) -> None:
+        """
+        Print the coverage report of a budgeted search.
+        """
+        table = Table(title="[b turquoise2]Coverage[/b turquoise2]")
+        table.add_column("Chunks", justify="right")
+        table.add_column("Domains", justify="right")
+        table.add_column("Separators")
+        table.add_column("Searched", justify="right")
+        table.add_column("Status")
+        styles = {"complete": "green3", "previous run": "green3", "match": "bold green3", "partial": "orange3", "not started": "bright_red"}
+        for subspace in self.subspaces:
+            table.add_row(
+                str(subspace["chunks"]),
+                subspace["domains"],
+                subspace["separators"],
+                f"{subspace['searched']}/{subspace['count']}",
+                f"[{styles[subspace['status']]}]{subspace['status']}[/{styles[subspace['status']]}]",
+            )
+        self.rich.print(table)
+        if self.out_of_budget:
+            self.rich.print(
+                f"[orange3]Budget used up after {self.n} candidates.[/orange3] "
+                + (f"Run again with the coverage file {self.coverage_file} to continue.\n" if self.coverage_file else "\n")
+            )
+        if self.coverage_file:
+            self.save_coverage(self.subspaces)
+
     async def collect_elements(self) -> None:
         """
         Main method to collect elements, enumerate possible email addresses and display results.
@@ -173,17 +547,21 @@ class Enumerator:
         # detect if account is a hash and set hash_type
         self.hash_type = self.check_hash(self.account)
 
+        profile_task = None
         if self.hash_type:
             # account has already been a hash
             self.account_hash = self.account
             self.gravatar_instance = Gravatar(ghash=self.account)
-            self.gravatar = await self.gravatar_instance.aggregate_gravatar_infos()
-            if not self.gravatar:
-                # no gravatar account found by hash
-                if self.elements is None:
-                    self._print_no_gravatar()
-                    exit()
-                elif self.elements:
+            if self.elements and not self.budgeted:
+                # pipelined mode: fetch the profile while the provided elements are enumerated
+                profile_task = asyncio.create_task(self.fetch_profile())
+            else:
+                self.gravatar = await self.gravatar_instance.aggregate_gravatar_infos(self.profile_sections)
+                if not self.gravatar:
+                    # no gravatar account found by hash
+                    if not self.elements:
+                        self._print_no_gravatar()
+                        exit()
                     # warn and continue with provided elements
                     self.rich.print(
                         f"[bright_red]No Gravatar account found for the provided hash: {self.account}.[/bright_red]\n"
@@ -192,7 +570,7 @@ class Enumerator:
         else:
             # account is an email or username
             self.gravatar_instance = Gravatar(account=self.account)
-            self.gravatar = await self.gravatar_instance.aggregate_gravatar_infos()
+            self.gravatar = await self.gravatar_instance.aggregate_gravatar_infos(self.profile_sections)
             if self.gravatar:
                 # set hash from gravatar data
                 self.account_hash = self.gravatar["Hash"]
@@ -204,43 +582,54 @@ class Enumerator:
 
         if self.gravatar:
             # retrieve public emails and chunk elements/domains
-            self.get_public_emails()
-            self.chunks, domains = GetElements(self.gravatar).get_elements()
-            self.add_links_domains()
-            self.add_element_domains(domains)
-            self.len_domains = len(self.domains)
+            self.add_profile_elements()
 
-        if self.elements:
-            # include any user-provided elements
-            for e in self.elements:
-                if e not in self.chunks:
-                    self.chunks.append(e)
+        # include any user-provided elements
+        self.add_user_elements()
 
         # prepare permutator and count combinations
-        permute = Permute(self.chunks, self.domains, self.crazy)
+        # copies, so that profile elements merged later don't alter the running search
+        self.schedule_elements()
+        permute = Permute(
+            list(self.chunks), list(self.domains), self.crazy, self.mutator, self.domains_file, self.provider_rules
+        )
+        self.schedule(permute)
         self.combination_count = permute.get_combination_count()
 
         # display enumeration stats
-        self.rich.print(
-            f"Elements to permute: [gold3]{self.show_chunks()}[/gold3]\n"
-            f"Number of email domains: {self.len_domains}\n"
-            f"Number of possible combinations: {self.combination_count}\n"
-        )
+        self.show_stats()
+        if profile_task:
+            self.rich.print("[orange3]Retrieving the Gravatar profile while enumerating the provided elements...[/orange3]\n")
 
         # get appropriate hashing function
         self.hasher = self._get_hasher(self.hash_type)
 
-        enum_email_found = None
+        # choose how to run the search from its size and the hash rate of this machine
+        self.plan_search(permute)
+
         # iterate over all permutations with progress bar
         progress = tqdm(total=self.combination_count, desc="Comparing email hashes", unit="it")
-        for email in permute.combinator():
-            hashed = self.hasher(email)
-            progress.update(1)
-            if hashed == self.account_hash:
-                # email matching the hash
-                enum_email_found = email
-                break
+        if profile_task:
+            # merge the profile elements into the progress bar as soon as they arrive
+            profile_task.add_done_callback(
+                lambda task: self.merge_profile(task.result(), permute, progress)
+            )
+        if self.budgeted:
+            # cheapest subspaces first, within the budget
+            enum_email_found = await self.budgeted_search(permute, progress)
+        else:
+            enum_email_found = await self.search(permute, progress)
+        if profile_task:
+            await profile_task
+            # the done callback may not have run yet if the profile arrived at the end of the search
+            self.merge_profile(profile_task.result(), permute, progress)
+            if not enum_email_found and self.delta_permute:
+                # only the part of the space not searched yet, planned on its own
+                self.plan_search(self.delta_permute, progress)
+                enum_email_found = await self.search(self.delta_permute, progress)
         progress.close()
+        if self.budgeted:
+            self.show_coverage()
 
         # display results
         self.rich.print(f"\n[bold u turquoise2]RESULTS:")
@@ -254,6 +643,7 @@ class Enumerator:
             for public_email in self.public_emails:
                 if self.account_hash == self.hasher(public_email):
                     # public email matches the account hash
+                    self.learn(public_email)
                     self.rich.print(
                         f"[bold green3]{public_email} matches the account hash.[/bold green3] "
                         "It's used as the primary Gravatar email for the account"
@@ -267,6 +657,7 @@ class Enumerator:
 
         if enum_email_found:
             # Yay !
+            self.learn(enum_email_found)
             self.rich.print(
                 f"\n[bright_white]An email has been found with the email hashes enumeration:[/bright_white] "
                 f"[bold green3]{enum_email_found}[/bold green3]\n"
@@ -281,3 +672,31 @@ class Enumerator:
                 f"\n[red]No email found matching the account hash:[/red] [bright_white]{self.account_hash}[/bright_white]"
             )
         print("\n")
+
+
+# permutator and account hash of a worker process
+worker = {}
+
+
+def init_worker(permute: Permute, account_hash: str, hash_type: str) -> None:
+    """
+    Set up a worker process of the process pool.
+    """
+    worker["permute"] = permute
+    worker["account_hash"] = account_hash
+    worker["hasher"] = Enumerator._get_hasher(hash_type)
+
+
+def search_batch(batch: tuple) -> tuple:
+    """
+    Compare the hashes of a batch of permutations in a worker process.
+    Return the email matching the hash if any, and the number of emails compared.
+    """
+    hasher = worker["hasher"]
+    account_hash = worker["account_hash"]
+    count = 0
+    for email in worker["permute"].batch_combinator(batch):
+        count += 1
+        if hasher(email) == account_hash:
+            return email, count
+    return None, count
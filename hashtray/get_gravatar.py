@@ -11,11 +11,18 @@ from scrapling.fetchers import AsyncFetcher
 logging.getLogger("scrapling").setLevel(logging.CRITICAL)
 
 class Gravatar:
-    def __init__(self, email=None, ghash: str = None, account: str = None):
+    def __init__(
+        self,
+        email=None,
+        ghash: str = None,
+        account: str = None,
+        gravatar_url: str = "https://gravatar.com/",
+    ):
         self.rich = Console(
             highlight=False, theme=Theme({"repr.url": "not underline white"})
         )
-        self.gravatar_url = "https://gravatar.com/"
+        # base URL, can point to a local stub server for benchmarks
+        self.gravatar_url = gravatar_url
         self.email = email
         self.account = account
         if account:
@@ -30,6 +37,18 @@ class Gravatar:
             self.account_url = self.gravatar_url + self.hash
         self.json_hash = None
         self.is_exists = False
+        # cached json data, page and parsed sections, so that each is retrieved only once
+        self.json_data = None
+        self.gravatar_page = None
+        self.scrapped_infos = {}
+        # scrapped sections and their parser
+        self.scrap_sections = {
+            "Verified accounts": self.find_accounts,
+            "Payments": self.find_payments,
+            "Photos": self.find_images,
+            "Interests": self.find_interests,
+            "Links": self.find_links,
+        }
 
 
     def check_email(self) -> bool:
@@ -46,13 +65,16 @@ class Gravatar:
         """
         Get the user's json data from Gravatar
         """
+        if self.json_data:
+            return self.json_data
         async with httpx.AsyncClient() as client:
             try:
                 res = await client.get(self.account_url + ".json")
                 res.raise_for_status()
                 self.is_exists = True
                 self.hash = res.json()["entry"][0]["hash"]
-                return res.json()["entry"][0]
+                self.json_data = res.json()["entry"][0]
+                return self.json_data
             except httpx.HTTPError:
                 if res.status_code == 404:
                     self.rich.print(f"[red]Gravatar profile not found (404 HTTP status error)[/red]")
@@ -67,86 +89,106 @@ class Gravatar:
                 self.rich.print(f"[red]An error occurred: {e}[/red]")
             return None
 
-    async def scrap_account(self) -> dict:
-        """
-        Scrap the user account page to retrieve all infos as the json/API is now limited
-        """
-        def find_accounts(page):
-            if verified := page.find(".is-verified-accounts"):
-                accounts_list = []
-                for account in verified.find_all(".card-item__info"):
-                    network = account.find(".card-item__label-text").text.clean()
-                    urls = account.find_all("a")
-                    for url in urls:
-                        if url.attrib.get("class") != "card-item__checkmark-icon":
-                            account_url = url.attrib["href"]
-                            accounts_list.append({"account": network, "url": account_url})
-                return accounts_list
-            return None
-
-        def find_images(page):
-            if gallery := page.find(".g-profile__photo-gallery"):
-                images_list = []
-                for image in gallery.find_all("img"):
-                    url = image.attrib["data-url"] + "?size=666"
-                    images_list.append(url)
-                return images_list
-            return None
+    @staticmethod
+    def find_accounts(page) -> list | None:
+        """
+        Parse the verified accounts section
+        """
+        if verified := page.find(".is-verified-accounts"):
+            accounts_list = []
+            for account in verified.find_all(".card-item__info"):
+                network = account.find(".card-item__label-text").text.clean()
+                urls = account.find_all("a")
+                for url in urls:
+                    if url.attrib.get("class") != "card-item__checkmark-icon":
+                        account_url = url.attrib["href"]
+                        accounts_list.append({"account": network, "url": account_url})
+            return accounts_list
+        return None
 
-        def find_payments(page):
-            if payment := page.find(".payments-drawer"):
-                payment_list = []
-                for item in payment.find_all(".card-item"):
-                    title = item.find(".card-item__label-text").text.clean()
-                    try:
-                        asset = item.find("a").attrib["href"]
-                    except:
-                        asset = item.find(".card-item__info span:not(.card-item__label-text)").text.clean()
-                    payment_list.append({"title": title, "asset": asset})
-                return payment_list if len(payment_list) > 0 else None
-            return None
+    @staticmethod
+    def find_images(page) -> list | None:
+        """
+        Parse the photo gallery section
+        """
+        if gallery := page.find(".g-profile__photo-gallery"):
+            images_list = []
+            for image in gallery.find_all("img"):
+                url = image.attrib["data-url"] + "?size=666"
+                images_list.append(url)
+            return images_list
+        return None
 
-        def find_interests(page):
-            if interests := page.find(".g-profile__interests-list"):
-                interests_list = []
-                for interest in interests.find_all("li a"):
-                    interests_list.append(interest.text.clean())
-                for interest in interests.find_all("li span"):
-                    interests_list.append(interest.text.clean())
-                return interests_list
-            return None
+    @staticmethod
+    def find_payments(page) -> list | None:
+        """
+        Parse the payments section
+        """
+        if payment := page.find(".payments-drawer"):
+            payment_list = []
+            for item in payment.find_all(".card-item"):
+                title = item.find(".card-item__label-text").text.clean()
+                try:
+                    asset = item.find("a").attrib["href"]
+                except:
+                    asset = item.find(".card-item__info span:not(.card-item__label-text)").text.clean()
+                payment_list.append({"title": title, "asset": asset})
+            return payment_list if len(payment_list) > 0 else None
+        return None
 
-        def find_links(page):
-            if links := page.find(".g-profile__links"):
-                links_list = []
-                for link in links.find_all(".card-item__info"):
-                    description = None
-                    a = link.find("a")
-                    name = a.text.clean()[:-2]
-                    url = a.attrib["href"]
-                    if desc := link.find("p"):
-                        description = desc.text
-                    links_list.append({"name": name, "url": url, "description": description})
-                return links_list
-            return None
+    @staticmethod
+    def find_interests(page) -> list | None:
+        """
+        Parse the interests section
+        """
+        if interests := page.find(".g-profile__interests-list"):
+            interests_list = []
+            for interest in interests.find_all("li a"):
+                interests_list.append(interest.text.clean())
+            for interest in interests.find_all("li span"):
+                interests_list.append(interest.text.clean())
+            return interests_list
+        return None
 
-        gravatar_page = await AsyncFetcher().get(self.account_url)
+    @staticmethod
+    def find_links(page) -> list | None:
+        """
+        Parse the links section
+        """
+        if links := page.find(".g-profile__links"):
+            links_list = []
+            for link in links.find_all(".card-item__info"):
+                description = None
+                a = link.find("a")
+                name = a.text.clean()[:-2]
+                url = a.attrib["href"]
+                if desc := link.find("p"):
+                    description = desc.text
+                links_list.append({"name": name, "url": url, "description": description})
+            return links_list
+        return None
 
-        scrapped_infos = {
-            "accounts": find_accounts(gravatar_page),
-            "photos": find_images(gravatar_page),
-            "payments": find_payments(gravatar_page),
-            "interests": find_interests(gravatar_page),
-            "links": find_links(gravatar_page),
-        }
-        return scrapped_infos
+    async def scrap_account(self, sections: list = None) -> dict:
+        """
+        Scrap the user account page to retrieve the requested sections (all by default) as the json/API is now limited.
+        The page is fetched once and each section is parsed only once, on demand.
+        """
+        sections = self.scrap_sections if sections is None else sections
+        missing = [section for section in sections if section not in self.scrapped_infos]
+        if missing:
+            if self.gravatar_page is None:
+                self.gravatar_page = await AsyncFetcher().get(self.account_url)
+            for section in missing:
+                self.scrapped_infos[section] = self.scrap_sections[section](self.gravatar_page)
+        return {section: self.scrapped_infos[section] for section in sections}
 
-    async def aggregate_gravatar_infos(self) -> dict | None:
+    async def aggregate_gravatar_infos(self, sections: list = None) -> dict | None:
         """
-        Aggregate the account json data and scrapped data
+        Aggregate the account json data and scrapped data.
+        Only the requested scrapped sections are retrieved, all by default.
         """
         if json_data := await self.get_gravatar_json():
-            scrapped_data = await self.scrap_account()
+            scrapped_data = await self.scrap_account(sections)
 
             infos = {
                 "Hash": self.hash or self.json_hash,
@@ -165,11 +207,11 @@ class Gravatar:
                 "Emails": [email["value"] for email in json_data.get("emails")] if json_data.get("emails") else None,
                 "Contact Info": json_data.get("contactInfo"),
                 "Phone Numbers": json_data.get("phoneNumbers"),
-                "Verified accounts": scrapped_data["accounts"],
-                "Payments": scrapped_data["payments"],
-                "Photos": scrapped_data["photos"],
-                "Interests": scrapped_data["interests"],
-                "Links": scrapped_data["links"],
+                "Verified accounts": scrapped_data.get("Verified accounts"),
+                "Payments": scrapped_data.get("Payments"),
+                "Photos": scrapped_data.get("Photos"),
+                "Interests": scrapped_data.get("Interests"),
+                "Links": scrapped_data.get("Links"),
             }
             return infos
         else:
@@ -201,7 +243,7 @@ class Gravatar:
 
             table.add_row(key, "\n".join(all_values))
 
-        # Get gravatar data
+        # Get gravatar data, already retrieved json data and sections are reused
         with self.rich.status("Retrieving and scraping profile...", spinner="dots", spinner_style="turquoise2") as status:
             data = await self.aggregate_gravatar_infos()
             if not data:
@@ -0,0 +1,193 @@
+import itertools
+import re
+import string
+from collections import Counter
+from math import perm
+from typing import Any, Generator, Iterable
+
+from hashtray.providers import LocalPartRule
+
+
+class Mutate:
+    """
+    Class to handle rules and masks applied to an email local part after permutation.
+    """
+
+    # Charsets usable in masks. Gravatar hashes lowercased emails, so uppercase is never needed.
+    charsets = {
+        "d": string.digits,
+        "l": string.ascii_lowercase,
+        "s": "._-",
+        "a": string.ascii_lowercase + string.digits,
+    }
+    # Leetspeak substitutions applied all at once to the local part
+    leet_table = str.maketrans({"a": "4", "e": "3", "i": "1", "o": "0", "s": "5", "t": "7"})
+    # Above this number of suffixes, masks are expanded lazily instead of being precompiled
+    compile_limit = 100_000
+
+    def __init__(self, masks: list = None, years: list = None, leet: bool = False):
+        self.masks = [self.parse_mask(mask) for mask in masks or []]
+        self.years = self.expand_years(years or [])
+        self.leet = leet
+        self.suffix_count = len(self.years) + sum(self.mask_count(mask) for mask in self.masks)
+        self.suffixes = self.compile_suffixes()
+
+    def __bool__(self) -> bool:
+        return self.leet or self.suffix_count > 0
+
+    @classmethod
+    def parse_mask(cls, mask: str) -> list:
+        """
+        Split a mask like "?d?d" or "x?d" into a list of charsets, one per position.
+        """
+        positions = []
+        i = 0
+        while i < len(mask):
+            if mask[i] == "?":
+                if i + 1 >= len(mask):
+                    raise ValueError(f"Incomplete mask placeholder: {mask}")
+                key = mask[i + 1]
+                if key == "?":
+                    # escaped question mark
+                    positions.append("?")
+                elif key in cls.charsets:
+                    positions.append(cls.charsets[key])
+                else:
+                    raise ValueError(f"Unknown mask placeholder ?{key} in {mask}")
+                i += 2
+            else:
+                # literal character
+                positions.append(mask[i].lower())
+                i += 1
+        if not positions:
+            raise ValueError("Empty mask")
+        return positions
+
+    @classmethod
+    def check_mask(cls, mask: str) -> str:
+        """
+        Check if a mask is valid and return it unchanged.
+        """
+        cls.parse_mask(mask)
+        return mask
+
+    @staticmethod
+    def parse_years(years: str) -> tuple:
+        """
+        Parse a year or a year range like "1970-2005" into a (start, end) tuple.
+        """
+        match = re.fullmatch(r"(\d{4})(?:-(\d{4}))?", years)
+        if not match:
+            raise ValueError(f"Invalid year range: {years}")
+        start = int(match.group(1))
+        end = int(match.group(2) or start)
+        if end < start:
+            raise ValueError(f"Invalid year range: {years}")
+        return start, end
+
+    @staticmethod
+    def expand_years(ranges: list) -> tuple:
+        """
+        Expand year ranges into deduped 4-digit and 2-digit suffixes.
+        """
+        years = []
+        for start, end in ranges:
+            years.extend(str(year) for year in range(start, end + 1))
+            years.extend(str(year)[2:] for year in range(start, end + 1))
+        return tuple(dict.fromkeys(years))
+
+    @staticmethod
+    def mask_count(mask: list) -> int:
+        """
+        Return the number of strings generated by a parsed mask.
+        """
+        count = 1
+        for charset in mask:
+            count *= len(charset)
+        return count
+
+    def compile_suffixes(self) -> tuple | None:
+        """
+        Precompute every suffix when small enough, so the generator only has to concatenate.
+        """
+        if self.suffix_count > self.compile_limit:
+            return None
+        return tuple(self.iter_suffixes())
+
+    def iter_suffixes(self) -> Iterable[str]:
+        """
+        Yield the years first, then every mask expansion.
+        """
+        yield from self.years
+        for mask in self.masks:
+            for chars in itertools.product(*mask):
+                yield "".join(chars)
+
+    def leet_chunk(self, chunk: str) -> str:
+        """
+        Return the leetspeak version of a chunk.
+        """
+        return chunk.lower().translate(self.leet_table)
+
+    def leetable(self, chunk: str) -> bool:
+        """
+        Check if the leet rule changes a chunk.
+        """
+        return self.leet_chunk(chunk) != chunk.lower()
+
+    def get_suffix_lengths(self, rule: LocalPartRule) -> Counter:
+        """
+        Return the number of suffixes a provider rule allows after a chunk, the empty suffix included,
+        by length and whether they start and end with a special character.
+        """
+        lengths = Counter({(0, False, False): 1})
+        for year in self.years:
+            if rule.allows_part(year):
+                lengths[(len(year), year[0] in rule.specials, year[-1] in rule.specials)] += 1
+        for mask in self.masks:
+            # number of expansions by (starts with a special, ends with a special), position by position
+            expansions = Counter()
+            for i, charset in enumerate(mask):
+                allowed = rule.chars.intersection(charset)
+                specials = len(allowed & rule.specials)
+                others = len(allowed) - specials
+                if not i:
+                    expansions = Counter({(True, True): specials, (False, False): others})
+                    continue
+                following = Counter()
+                for (first, last), count in expansions.items():
+                    following[(first, False)] += count * others
+                    if rule.consecutive_specials or not last:
+                        following[(first, True)] += count * specials
+                expansions = following
+            for (first, last), count in expansions.items():
+                if count:
+                    lengths[(len(mask), first, last)] += count
+        return lengths
+
+    def get_permutation_count(self, chunks: list, r: int) -> int:
+        """
+        Return the number of mutated local parts for all the permutations of r chunks and one separator.
+        Leet variants only exist for permutations holding at least one leetable chunk.
+        """
+        n = len(chunks)
+        permutations = perm(n, r)
+        local_parts = permutations
+        if self.leet:
+            plain = n - sum(1 for chunk in chunks if self.leetable(chunk))
+            local_parts += permutations - perm(plain, r)
+        return local_parts * (1 + self.suffix_count)
+
+    def mutate(self, local_part: str) -> Generator[str, Any, None]:
+        """
+        Yield the local part and all its variants.
+        """
+        if self.leet:
+            leet = local_part.lower().translate(self.leet_table)
+            variants = (local_part, leet) if leet != local_part.lower() else (local_part,)
+        else:
+            variants = (local_part,)
+        for variant in variants:
+            yield variant
+            for suffix in self.suffixes if self.suffixes is not None else self.iter_suffixes():
+                yield variant + suffix
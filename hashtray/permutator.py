@@ -1,70 +1,366 @@
 import itertools
+from collections import Counter
+from math import comb, factorial, perm
 from typing import Any, Generator
 
+from hashtray.domains import DomainsFile
+from hashtray.mutator import Mutate
+from hashtray.providers import LocalPartRule
+
 
 class Permute:
-    def __init__(self, chunks: list, domains: list, crazy: bool = False):
+    def __init__(
+        self,
+        chunks: list,
+        domains: list,
+        crazy: bool = False,
+        mutator: Mutate = None,
+        domains_file: DomainsFile = None,
+        rules: dict = None,
+    ):
 
         self.chunks = chunks
         self.len_chunks = len(self.chunks)
         self.crazy = crazy
         self.separators = ["", ".", "_", "-"]
         self.domains = domains
-        self.len_domains = len(self.domains)
+        # large domain list streamed from disk after the in-memory ones
+        self.domains_file = domains_file
+        self.len_domains = len(self.domains) + (len(self.domains_file) if self.domains_file else 0)
+        # rules and masks applied to each local part, if any
+        self.mutator = mutator if mutator else None
+        # already searched subspace, skipped by the combinator
+        self.searched = None
+        self.known_chunks = None
+        self.new_domains = None
+        # upper bounds of the in-memory domain tiers, the domain lists being ranked
+        self.domain_tiers = [50, 500, 5000]
+        # local part constraints of the providers, by domain
+        self.rules = rules or {}
+        self.rule_domains = self.get_rule_domains(self.domains, self.domains_file)
+        # number of allowed local parts per rule, number of chunks and separator mode
+        self.allowed_counts = {}
+        # number of chunk orders and separator arrangements allowed per rule, chunk classes and separator mode
+        self.arrangements = {}
+        # weights of the numbers of chunks, from past matches
+        self.chunk_weights = None
+
+    def get_chunk_counts(self) -> list:
+        # Numbers of chunks in search order: increasing, or by decreasing weight per candidate if weighted
+        chunk_counts = list(range(1, self.len_chunks + 1))
+        if not self.chunk_weights:
+            return chunk_counts
+        return sorted(chunk_counts, key=lambda r: -self.chunk_weights.get(r, 1) / max(self.get_r_count(r), 1))
+
+    def exclude(self, searched: "Permute") -> None:
+        # Skip the emails already generated by another permutator,
+        # made of a subset of the chunks and domains and of the same domains file
+        # (or of the same file without some of its domains, moved to the domains list)
+        self.searched = searched
+        self.known_chunks = set(searched.chunks)
+        known_domains = set(searched.domains)
+        if self.domains_file and searched.domains_file:
+            # already streamed from the searched domains file
+            known_domains |= self.domains_file.skip - searched.domains_file.skip
+        self.new_domains = [domain for domain in self.domains if domain not in known_domains]
+
+    def get_rule_domains(self, domains: list, domains_file: DomainsFile = None) -> list:
+        # Domains with a provider rule and their rule
+        rule_domains = [(domain, self.rules[domain]) for domain in domains if domain in self.rules]
+        if domains_file:
+            rule_domains.extend((domain, self.rules[domain]) for domain in domains_file.tracked if domain in self.rules)
+        return rule_domains
+
+    def get_local_part_count(self, r: int, mode: str = None) -> int:
+        # Calculate the number of local parts for r chunks, per domain without provider rule
+        if self.mutator:
+            # Mutated local parts for n chunks
+            combination_count = self.mutator.get_permutation_count(self.chunks, r)
+        else:
+            # Total possibilities for n chunks
+            combination_count = perm(self.len_chunks, r)
+        # x number of special chars
+        return combination_count * self.get_separator_count(r, mode)
+
+    @staticmethod
+    def get_chunk_class(rule: LocalPartRule, chunk: str) -> int:
+        # Class of a chunk for a provider rule: 2 if it starts with a special character, + 1 if it ends with one
+        return 2 * (chunk[:1] in rule.specials) + (chunk[-1:] in rule.specials)
+
+    def get_arrangements(self, rule: LocalPartRule, classes: tuple, mode: str = None) -> Counter:
+        # Number of orders of the chunk classes and of separator arrangements allowed by a provider rule,
+        # by number of non-empty separators and whether the local part starts and ends with a special character
+        # classes holds the number of chunks of each class, the chunks of a class being interchangeable
+        key = (id(rule), classes, mode)
+        if key in self.arrangements:
+            return self.arrangements[key]
+        r = sum(classes)
+        if r == 1:
+            # no separator
+            chunk_class = classes.index(1)
+            arrangements = Counter({(0, chunk_class >= 2, chunk_class % 2 == 1): 1})
+            self.arrangements[key] = arrangements
+            return arrangements
+        allowed = len([separator for separator in self.separators if separator and rule.allows_chars(separator)])
+        empty = "" in self.separators
+
+        def empty_gap(last: int, following: int) -> bool:
+            # the end of a chunk followed by the start of the next one
+            return rule.consecutive_specials or not (last % 2 and following >= 2)
+
+        def special_gap(last: int, following: int) -> bool:
+            # a special character between the end of a chunk and the start of the next one
+            return rule.consecutive_specials or not (last % 2 or following >= 2)
+
+        def count(gaps) -> Counter:
+            # gaps gives the (number of non-empty separators, number of separators) allowed between two classes
+            memo = {}
+
+            def extend(remaining: tuple, last: int) -> Counter:
+                # arrangements of the remaining chunks after a chunk of the last class
+                if not any(remaining):
+                    return Counter({(0, last % 2 == 1): 1})
+                if (remaining, last) in memo:
+                    return memo[(remaining, last)]
+                result = Counter()
+                for following, left in enumerate(remaining):
+                    if not left:
+                        continue
+                    options = gaps(last, following)
+                    if not options:
+                        continue
+                    rest = remaining[:following] + (left - 1,) + remaining[following + 1:]
+                    for (length, end), n in extend(rest, following).items():
+                        for separator_length, separator_count in options:
+                            result[(length + separator_length, end)] += n * separator_count
+                memo[(remaining, last)] = result
+                return result
+
+            arrangements = Counter()
+            for first, left in enumerate(classes):
+                if left:
+                    rest = classes[:first] + (left - 1,) + classes[first + 1:]
+                    for (length, end), n in extend(rest, first).items():
+                        arrangements[(length, first >= 2, end)] += n
+            return arrangements
+
+        # a unique separator: empty, or the same special character in every gap
+        single = count(lambda last, following: [(0, 1)] if empty and empty_gap(last, following) else [])
+        if allowed:
+            for (length, start, end), n in count(
+                lambda last, following: [(1, 1)] if special_gap(last, following) else []
+            ).items():
+                single[(length, start, end)] += n * allowed
+        if mode == "single" or (mode is None and not self.crazy):
+            arrangements = single
+        else:
+            # any allowed separator at any place
+            arrangements = count(
+                lambda last, following: (
+                    ([(0, 1)] if empty and empty_gap(last, following) else [])
+                    + ([(1, allowed)] if allowed and special_gap(last, following) else [])
+                )
+            )
+            if mode == "mixed":
+                arrangements.subtract(single)
+        self.arrangements[key] = arrangements
+        return arrangements
+
+    def get_allowed_count(self, rule: LocalPartRule, r: int, mode: str = None) -> int:
+        # Calculate the number of local parts for r chunks allowed by a provider rule
+        key = (id(rule), r, mode)
+        if key in self.allowed_counts:
+            return self.allowed_counts[key]
+        suffix_lengths = self.mutator.get_suffix_lengths(rule) if self.mutator else Counter({(0, False, False): 1})
+        total = 0
+        for subset in itertools.combinations(self.chunks, r):
+            variants = 0
+            if all(rule.allows_part(chunk) for chunk in subset):
+                variants += 1
+            if (
+                self.mutator
+                and self.mutator.leet
+                and any(self.mutator.leetable(chunk) for chunk in subset)
+                and all(rule.allows_part(self.mutator.leet_chunk(chunk)) for chunk in subset)
+            ):
+                # same length and special characters as the plain variant
+                variants += 1
+            if not variants:
+                continue
+            # the local part length only depends on the chunks, not on their order
+            length = sum(len(chunk) for chunk in subset)
+            classes = [0, 0, 0, 0]
+            for chunk in subset:
+                classes[self.get_chunk_class(rule, chunk)] += 1
+            # orders of the chunks within each class
+            orders = 1
+            for chunk_count in classes:
+                orders *= factorial(chunk_count)
+            for (separator_length, start, end), arrangement_count in self.get_arrangements(rule, tuple(classes), mode).items():
+                if start and not rule.leading_special:
+                    continue
+                for (suffix_length, suffix_start, suffix_end), suffix_count in suffix_lengths.items():
+                    if suffix_length:
+                        if end and suffix_start and not rule.consecutive_specials:
+                            continue
+                        last = suffix_end
+                    else:
+                        last = end
+                    if last and not rule.trailing_special:
+                        continue
+                    if rule.min_length <= length + separator_length + suffix_length <= rule.max_length:
+                        total += variants * orders * arrangement_count * suffix_count
+        self.allowed_counts[key] = total
+        return total
+
+    def get_domains_count(self, r: int, mode: str, len_domains: int, rule_domains: list) -> int:
+        # Calculate the number of combinations for r chunks over some domains, provider rules applied
+        local_part_count = self.get_local_part_count(r, mode)
+        total = local_part_count * len_domains
+        for domain, rule in rule_domains:
+            total -= local_part_count - self.get_allowed_count(rule, r, mode)
+        return total
+
+    def get_r_count(self, r: int) -> int:
+        # Calculate the number of combinations for r chunks, before any exclusion
+        return self.get_domains_count(r, None, self.len_domains, self.rule_domains)
 
     def get_combination_count(self) -> int:
         # Calculate the total number of combinations for tdqm bar progress
-        total = 0
+        total = sum(self.get_r_count(r) for r in range(1, self.len_chunks + 1))
+        if self.searched is not None:
+            # Remove the already searched subspace
+            total -= self.searched.get_combination_count()
+        return total
+
+    def get_domain_tiers(self) -> list:
+        # Split the domains into tiers: slices of the ranked in-memory domains, then the streamed file
+        tiers = []
+        start = 0
+        for end in self.domain_tiers + [len(self.domains)]:
+            end = min(end, len(self.domains))
+            if end > start:
+                tiers.append((f"{start + 1}-{end}", self.domains[start:end]))
+                start = end
+        if self.domains_file:
+            tiers.append(("file", self.domains_file))
+        return tiers
+
+    def get_separator_count(self, r: int, mode: str = None) -> int:
+        # Number of separator arrangements for r chunks in a separator mode
+        # Without mode, the separators depend on the crazy mode
+        if r == 1:
+            return 1
+        elif mode == "single" or (mode is None and not self.crazy):
+            return len(self.separators)
+        elif mode is None:
+            return len(self.separators) ** (r - 1)
+        else:
+            # any separator at any place, minus the arrangements with a single separator
+            return len(self.separators) ** (r - 1) - len(self.separators)
+
+    def get_subspaces(self) -> list:
+        # Split the search space by number of chunks, domain tier and separator mode, cheapest first
+        subspaces = []
+        modes = ["single", "mixed"] if self.crazy else ["single"]
         for r in range(1, self.len_chunks + 1):
-            if r == 1:
-                # Add single chunks
-                total += self.len_chunks
+            for mode in modes if r > 2 else ["single"]:
+                for tier, domains in self.get_domain_tiers():
+                    if tier == "file":
+                        rule_domains = self.get_rule_domains([], domains)
+                    else:
+                        rule_domains = self.get_rule_domains(domains)
+                    subspaces.append({
+                        "chunks": r,
+                        "domains": tier,
+                        "separators": mode,
+                        "count": self.get_domains_count(r, mode, len(domains), rule_domains),
+                    })
+        if self.chunk_weights:
+            # cheapest per expected match first
+            return sorted(subspaces, key=lambda subspace: subspace["count"] / self.chunk_weights.get(subspace["chunks"], 1))
+        return sorted(subspaces, key=lambda subspace: subspace["count"])
+
+    def subspace_combinator(self, subspace: dict) -> Generator[str, Any, None]:
+        # Generate the email combinations of a single subspace
+        domains = dict(self.get_domain_tiers())[subspace["domains"]]
+        for permutation in itertools.permutations(self.chunks, subspace["chunks"]):
+            yield from self.permutation_combinator(permutation, domains, subspace["separators"])
+
+    def local_parts(self, permutation: tuple, mode: str = None) -> Generator[str, Any, None]:
+        # Generate the local parts of a permutation, before any rule or mask
+        # Without mode, the separators depend on the crazy mode
+        if len(permutation) == 1:
+            # No need of separator for single chunks
+            yield permutation[0]
+        elif mode == "mixed" or (mode is None and self.crazy):
+            # Crazy mode: per separator, any kind of separator in each combination at any place
+            for separators in itertools.product(self.separators, repeat=len(permutation) - 1):
+                if mode == "mixed" and len(set(separators)) == 1:
+                    # single separator arrangements are in the single mode
+                    continue
+                yield "".join(
+                    f"{e}{s}"
+                    for e, s in itertools.zip_longest(permutation, separators, fillvalue="")
+                )
+        else:
+            # Normal mode: per separator, unique separator in each combination at any place
+            for separator in self.separators:
+                yield separator.join(permutation)
+
+    def permutation_combinator(
+        self, permutation: tuple, domains=None, mode: str = None
+    ) -> Generator[str, Any, None]:
+        # Generate all possible email combinations for a permutation of elements
+        # Without domains, all of them, or only the new ones if the permutation has already been searched
+        if domains is None:
+            if self.known_chunks is not None and self.known_chunks.issuperset(permutation):
+                domains = self.new_domains
+            elif self.domains_file:
+                domains = itertools.chain(self.domains, self.domains_file)
             else:
-                # Calc. combinations
-                combinations = itertools.combinations(range(self.len_chunks), r)
-                # Calc. permutations
-                permutations = itertools.permutations(range(r))
-                # Total possibilities for n chunks
-                combination_count = len(list(combinations)) * len(list(permutations))
-                # x number of special chars
-                if self.crazy:
-                    # crazy mode
-                    total += combination_count * len(self.separators) ** (r - 1)
-                else:
-                    # normal mode
-                    total += combination_count * len(self.separators)
-        # Multiply by the number of domains
-        return total * self.len_domains
+                domains = self.domains
+        # Local parts are the same for every domain
+        local_parts = list(self.local_parts(permutation, mode))
+        # Per domain
+        for domain in domains:
+            rule = self.rules.get(domain)
+            for email_local_part in local_parts:
+                if self.mutator:
+                    # Per rule/mask variant of the local part
+                    for variant in self.mutator.mutate(email_local_part):
+                        if rule is None or rule.allows(variant):
+                            yield f"{variant}@{domain}"
+                elif rule is None or rule.allows(email_local_part):
+                    yield f"{email_local_part}@{domain}"
 
     def combinator(self) -> Generator[str, Any, None]:
         # Generate all possible email combinations for unique elements
 
         # Generate all permutations/combinations of elements
         # Per chunk
-        for r in range(1, len(self.chunks) + 1):
+        for r in self.get_chunk_counts():
             # Per chunk permutation
             for permutation in itertools.permutations(self.chunks, r):
-                # Per domain
-                for domain in self.domains:
-                    # No need of separator for single chunks
-                    if len(permutation) == 1:
-                        email_local_part = permutation[0]
-                        yield f"{email_local_part}@{domain}"
-                    else:
-                        # Crazy mode: per separator, any kind of separator in each combination at any place
-                        if self.crazy:
-                            for separators in itertools.product(
-                                self.separators, repeat=r - 1
-                            ):
-                                email_local_part = "".join(
-                                    f"{e}{s}"
-                                    for e, s in itertools.zip_longest(
-                                        permutation, separators, fillvalue=""
-                                    )
-                                )
-                                yield f"{email_local_part}@{domain}"
-                        else:
-                            # Normal mode: per separator, unique separator in each combination at any place
-                            for separator in self.separators:
-                                email_local_part = separator.join(permutation)
-                                yield f"{email_local_part}@{domain}"
+                yield from self.permutation_combinator(permutation)
+
+    def get_batches(self, batch_size: int) -> Generator[tuple, Any, None]:
+        # Split the permutations into batches of about batch_size emails
+        # A batch is the number of chunks and a prefix shared by all its permutations
+        for r in self.get_chunk_counts():
+            # average number of emails per permutation of r chunks
+            per_permutation = max(1, self.get_r_count(r) // perm(self.len_chunks, r))
+            # shortest prefix giving small enough batches
+            prefix_length = 0
+            while prefix_length < r and perm(self.len_chunks - prefix_length, r - prefix_length) * per_permutation > batch_size:
+                prefix_length += 1
+            for prefix in itertools.permutations(range(self.len_chunks), prefix_length):
+                yield r, prefix
+
+    def batch_combinator(self, batch: tuple) -> Generator[str, Any, None]:
+        # Generate all possible email combinations of a batch, in the combinator order
+        r, prefix = batch
+        head = tuple(self.chunks[i] for i in prefix)
+        rest = [chunk for i, chunk in enumerate(self.chunks) if i not in prefix]
+        for tail in itertools.permutations(rest, r - len(prefix)):
+            yield from self.permutation_combinator(head + tail)
@@ -0,0 +1,93 @@
+import os
+import time
+from datetime import timedelta
+from typing import Callable
+
+from hashtray.permutator import Permute
+
+
+class Planner:
+    """
+    Class to choose how to run an enumeration job, from its size and the hash rate measured on this machine.
+    """
+
+    # seconds of hashing used to measure the hash rate
+    calibration_time = 0.2
+    # below this single core duration (seconds), starting worker processes isn't worth it
+    inline_threshold = 5
+    # target duration of a batch in a worker (seconds)
+    batch_time = 0.5
+    # progress bar updates per second when running inline
+    updates_per_second = 20
+
+    def __init__(self, permute: Permute, hasher: Callable, account_hash: str, budgeted: bool = False):
+        self.permute = permute
+        self.hasher = hasher
+        self.account_hash = account_hash
+        self.budgeted = budgeted
+        self.combination_count = permute.get_combination_count()
+        self.cpu_count = os.cpu_count() or 1
+        self.hash_rate = 0
+        self.mode = "inline"
+        self.workers = 1
+        self.batch_size = 0
+        self.progress_interval = 1
+        self.eta = 0
+
+    def calibrate(self) -> float:
+        """
+        Measure the number of emails generated and hashed per second on a single core.
+        """
+        count = 0
+        matches = 0
+        start = time.perf_counter()
+        for email in self.permute.combinator():
+            # same work as the search loop
+            matches += self.hasher(email) == self.account_hash
+            count += 1
+            if not count % 1_000 and time.perf_counter() - start >= self.calibration_time:
+                break
+        elapsed = time.perf_counter() - start
+        self.hash_rate = count / elapsed if count else 0
+        return self.hash_rate
+
+    def plan(self) -> None:
+        """
+        Choose inline or process pool execution, the number of workers, the batch size
+        and the progress update interval.
+        """
+        if not self.hash_rate:
+            self.calibrate()
+        single_core_time = self.combination_count / self.hash_rate if self.hash_rate else 0
+        if self.budgeted or self.cpu_count == 1 or single_core_time < self.inline_threshold:
+            # budgeted searches go through the subspaces in order, in the main process
+            self.mode = "inline"
+            self.workers = 1
+            self.progress_interval = max(1, int(self.hash_rate / self.updates_per_second))
+            self.eta = single_core_time
+        else:
+            self.mode = "process pool"
+            # no more workers than batches of work
+            self.workers = min(self.cpu_count, max(2, int(single_core_time / self.batch_time)))
+            # batches of about batch_time seconds, enough of them to balance the workers
+            self.batch_size = max(
+                10_000,
+                min(int(self.hash_rate * self.batch_time), self.combination_count // (self.workers * 8)),
+            )
+            # progress updated at each finished batch
+            self.progress_interval = self.batch_size
+            self.eta = single_core_time / self.workers
+
+    def get_plan(self) -> str:
+        """
+        Return the chosen execution plan and its ETA.
+        """
+        if self.mode == "inline":
+            details = "single process"
+        else:
+            details = f"{self.workers} workers, batches of ~{self.batch_size:,} emails"
+        return (
+            f"Execution plan: {self.mode} ({details}) - "
+            f"hash rate {self.hash_rate:,.0f}/s per core - "
+            f"ETA {timedelta(seconds=round(self.eta))}"
+        )
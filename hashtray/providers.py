@@ -0,0 +1,76 @@
+import json
+import string
+from pathlib import Path
+
+
+class LocalPartRule:
+    """
+    Class to handle the local part constraints of an email provider.
+    """
+
+    def __init__(
+        self,
+        specials: str = "",
+        min_length: int = 1,
+        max_length: int = 64,
+        leading_special: bool = True,
+        trailing_special: bool = True,
+        consecutive_specials: bool = True,
+    ):
+        # letters and digits are allowed by every provider, case doesn't matter
+        self.chars = frozenset(string.ascii_letters + string.digits + specials)
+        self.specials = frozenset(specials)
+        self.min_length = min_length
+        self.max_length = max_length
+        # where the special characters may appear
+        self.leading_special = leading_special
+        self.trailing_special = trailing_special
+        self.consecutive_specials = consecutive_specials
+
+    def allows_chars(self, s: str) -> bool:
+        """
+        Check if every character of a string is allowed.
+        """
+        return self.chars.issuperset(s)
+
+    def allows_part(self, s: str) -> bool:
+        """
+        Check if a string can be a part of a local part: allowed characters and no forbidden consecutive specials.
+        """
+        if not self.chars.issuperset(s):
+            return False
+        if not self.consecutive_specials:
+            return not any(a in self.specials and b in self.specials for a, b in zip(s, s[1:]))
+        return True
+
+    def allows(self, local_part: str) -> bool:
+        """
+        Check if a local part can exist at the provider.
+        """
+        return (
+            self.min_length <= len(local_part) <= self.max_length
+            and self.allows_part(local_part)
+            and (self.leading_special or local_part[0] not in self.specials)
+            and (self.trailing_special or local_part[-1] not in self.specials)
+        )
+
+    @staticmethod
+    def load_rules() -> dict:
+        """
+        Load the provider rules stored with the domain lists, by domain.
+        """
+        with open(Path(Path(__file__).parent, "data", "provider_rules.json"), "r") as f:
+            providers = json.load(f)
+        rules = {}
+        for provider in providers:
+            rule = LocalPartRule(
+                provider["specials"],
+                provider["min_length"],
+                provider["max_length"],
+                provider["leading_special"],
+                provider["trailing_special"],
+                provider["consecutive_specials"],
+            )
+            for domain in provider["domains"]:
+                rules[domain] = rule
+        return rules
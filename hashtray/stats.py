@@ -0,0 +1,179 @@
+import json
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+from hashtray.mutator import Mutate
+
+
+class Statistics:
+    """
+    Class to handle the local statistics of past matches, used to order the next searches.
+    Everything stays in a local JSON file, which can be exported and imported between analysts.
+    """
+
+    default_path = Path(Path.home(), ".hashtray", "stats.json")
+    sections = ["chunk_counts", "separators", "domains", "shapes"]
+
+    def __init__(self, path: str = None):
+        self.path = Path(path) if path else self.default_path
+        # one record per match, by unique id, so that importing the same matches twice doesn't count them twice
+        self.records = {}
+        self.matches = 0
+        self.counters = {section: Counter() for section in self.sections}
+        if self.path.is_file():
+            self.merge(self.path)
+
+    def count(self) -> None:
+        """
+        Count the matches per section from the records.
+        """
+        self.matches = len(self.records)
+        self.counters = {section: Counter() for section in self.sections}
+        for record in self.records.values():
+            for section in self.sections:
+                if record.get(section) is not None:
+                    self.counters[section][str(record[section])] += 1
+
+    def merge(self, path: str) -> int:
+        """
+        Add the records of another file to these ones, skipping the ones already there.
+        Return the number of new records.
+        """
+        with open(path, "r") as f:
+            data = json.load(f)
+        new = {key: record for key, record in data.get("records", {}).items() if key not in self.records}
+        self.records.update(new)
+        self.count()
+        return len(new)
+
+    def save(self, path: str = None) -> None:
+        """
+        Save the statistics to their file, or export them to another one.
+        """
+        path = Path(path) if path else self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"records": self.records}, f, indent=4)
+
+    @staticmethod
+    def decompose(local_part: str, chunks: list, separators: list) -> tuple | None:
+        """
+        Split a local part into the chunks and separators it was generated from, and a suffix.
+        Return the chunks, the separators and the suffix, or None if the local part can't be split.
+        """
+        forms = {}
+        for chunk in chunks:
+            forms.setdefault(chunk.lower(), chunk)
+            # leetspeak variant
+            forms.setdefault(chunk.lower().translate(Mutate.leet_table), chunk)
+
+        def split(rest: str, used: list, seps: list):
+            # longest chunks first, then the shortest suffix
+            for form in sorted(forms, key=len, reverse=True):
+                chunk = forms[form]
+                if chunk in used or not rest.startswith(form):
+                    continue
+                tail = rest[len(form):]
+                if not tail:
+                    return used + [chunk], seps, ""
+                for separator in sorted(separators, key=len, reverse=True):
+                    if tail.startswith(separator):
+                        found = split(tail[len(separator):], used + [chunk], seps + [separator])
+                        if found:
+                            return found
+                # what is left is a suffix
+                return used + [chunk], seps, tail
+            return None
+
+        return split(local_part.lower(), [], [])
+
+    @staticmethod
+    def get_shape(chunks: list, separators: list, suffix: str) -> str:
+        """
+        Return the shape of a local part: i for an initial, w for a longer chunk, then the separators and the suffix.
+        """
+        shape = "".join(
+            ("i" if len(chunk) == 1 else "w") + (separators[i] if i < len(separators) else "")
+            for i, chunk in enumerate(chunks)
+        )
+        if suffix:
+            shape += f"+{'d' if suffix.isdigit() else 'x'}{len(suffix)}"
+        return shape
+
+    def record(self, email: str, chunks: list, separators: list) -> None:
+        """
+        Record a matching email: its domain, number of chunks, separators and shape.
+        The local part itself isn't kept.
+        """
+        local_part, domain = email.lower().rsplit("@", 1)
+        record = {section: None for section in self.sections}
+        record["domains"] = domain
+        decomposed = self.decompose(local_part, chunks, separators)
+        if decomposed:
+            used, seps, suffix = decomposed
+            record["chunk_counts"] = len(used)
+            if not seps:
+                record["separators"] = "none"
+            elif len(set(seps)) == 1:
+                record["separators"] = seps[0]
+            else:
+                record["separators"] = "mixed"
+            record["shapes"] = self.get_shape(used, seps, suffix)
+        self.records[uuid.uuid4().hex] = record
+        self.count()
+
+    def order_domains(self, domains: list) -> list:
+        """
+        Put the domains of past matches first, the most frequent first, the others keeping their rank.
+        """
+        hits = self.counters["domains"]
+        return sorted(domains, key=lambda domain: -hits[domain])
+
+    def order_chunks(self, chunks: list) -> list:
+        """
+        Put first the chunks of the kind (initial or word) past matches start with the most,
+        so that the permutations starting with them are tried first.
+        """
+        hits = Counter()
+        for shape, count in self.counters["shapes"].items():
+            hits[shape[0]] += count
+        return sorted(chunks, key=lambda chunk: -hits["i" if len(chunk) == 1 else "w"])
+
+    def order_separators(self, separators: list) -> list:
+        """
+        Put the most frequent separators of past matches first.
+        """
+        hits = self.counters["separators"]
+        return sorted(separators, key=lambda separator: -hits[separator])
+
+    def get_chunk_weights(self) -> dict:
+        """
+        Weight the numbers of chunks by their past matches.
+        Numbers of chunks without past matches get one virtual match, so that they are still tried.
+        """
+        return {int(r): hits + 1 for r, hits in self.counters["chunk_counts"].items()}
+
+    def show(self, rich: Console, top: int = 10) -> None:
+        """
+        Print the most frequent values of each section.
+        """
+        rich.print(f"[bold turquoise2]Statistics:[/bold turquoise2] {self.matches} match(es) in {self.path}")
+        titles = {
+            "chunk_counts": "Chunks",
+            "separators": "Separators",
+            "domains": "Domains",
+            "shapes": "Shapes",
+        }
+        for section in self.sections:
+            if not self.counters[section]:
+                continue
+            table = Table(title=f"[b turquoise2]{titles[section]}[/b turquoise2]")
+            table.add_column(titles[section])
+            table.add_column("Matches", justify="right")
+            for value, hits in self.counters[section].most_common(top):
+                table.add_row(repr(value) if section == "separators" and value != "none" else value, str(hits))
+            rich.print(table)
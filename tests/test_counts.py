@@ -0,0 +1,118 @@
+import itertools
+from collections import Counter
+
+import pytest
+
+from hashtray.domains import DomainsFile
+from hashtray.mutator import Mutate
+from hashtray.permutator import Permute
+from hashtray.providers import LocalPartRule
+
+# built-in domains with and without provider rules, the domains file adding one allowing specials anywhere
+DOMAINS = ["gmail.com", "example.org", "yahoo.com", "icloud.com", "outlook.com", "aol.com"]
+# chunks with characters some providers don't allow, single letters,
+# and leading, trailing or consecutive special characters
+CHUNKS = [
+    ["john", "doe"],
+    ["jo", "doe", "a_b", "s"],
+    ["Marco", "x-y", "polo", "m"],
+    ["_jo", "doe.", "a..b", "-"],
+]
+MUTATORS = [
+    None,
+    Mutate(leet=True),
+    Mutate(masks=["?d", "?s?d"]),
+    Mutate(masks=["x?s"], years=[(1987, 1988)], leet=True),
+    Mutate(masks=["?s", "?s?s"]),
+]
+
+
+@pytest.fixture(scope="module")
+def rules() -> dict:
+    return LocalPartRule.load_rules()
+
+
+@pytest.fixture(scope="module")
+def domains_file(tmp_path_factory, rules) -> DomainsFile:
+    path = tmp_path_factory.mktemp("domains") / "domains.txt"
+    path.write_text("# comment\nnaver.com\nfoo.org\nGMAIL.com.\nyandex.ru\nfoo.org\nbar.net\n")
+    return DomainsFile(path, exclude=DOMAINS, track=rules)
+
+
+def test_domains_file_dedupe(domains_file):
+    assert list(domains_file) == ["bar.net", "foo.org", "naver.com", "yandex.ru"]
+    assert len(domains_file) == 4
+    assert domains_file.tracked == {"naver.com", "yandex.ru"}
+
+
+def test_special_positions(rules):
+    gmail = rules["gmail.com"]
+    assert gmail.allows("john.doe")
+    assert not gmail.allows(".johndoe")
+    assert not gmail.allows("johndoe.")
+    assert not gmail.allows("john..doe")
+    assert rules["naver.com"].allows("_john__doe-")
+
+    # a ?s mask suffix only leaves the endings a provider allows
+    permute = Permute(["john", "doe"], ["gmail.com", "naver.com"], True, Mutate(masks=["?s", "?d?s?d"]), rules=rules)
+    emails = list(permute.combinator())
+    assert len(emails) == permute.get_combination_count()
+    gmail_local_parts = [email[: -len("@gmail.com")] for email in emails if email.endswith("@gmail.com")]
+    assert gmail_local_parts
+    assert all(gmail.allows(local_part) for local_part in gmail_local_parts)
+    assert "john.doe" in gmail_local_parts and "john.doe1.2" in gmail_local_parts
+    assert "john.doe." not in gmail_local_parts
+    assert "johndoe_@naver.com" in emails
+
+
+@pytest.mark.parametrize("mutator", MUTATORS[1:])
+@pytest.mark.parametrize("chunks", CHUNKS)
+def test_mutator_count(chunks, mutator):
+    for r in range(1, len(chunks) + 1):
+        generated = [
+            local_part
+            for permutation in itertools.permutations(chunks, r)
+            for local_part in mutator.mutate("".join(permutation))
+        ]
+        assert len(generated) == mutator.get_permutation_count(chunks, r)
+
+
+@pytest.mark.parametrize("with_file", [False, True])
+@pytest.mark.parametrize("with_rules", [False, True])
+@pytest.mark.parametrize("mutator", MUTATORS)
+@pytest.mark.parametrize("crazy", [False, True])
+@pytest.mark.parametrize("chunks", CHUNKS)
+def test_combination_count(chunks, crazy, mutator, with_rules, with_file, rules, domains_file):
+    permute = Permute(
+        chunks, DOMAINS, crazy, mutator, domains_file if with_file else None, rules if with_rules else None
+    )
+    emails = list(permute.combinator())
+    assert len(emails) == permute.get_combination_count()
+
+    # the subspaces split the search space exactly
+    subspaces = permute.get_subspaces()
+    for subspace in subspaces:
+        assert len(list(permute.subspace_combinator(subspace))) == subspace["count"]
+    assert Counter(email for subspace in subspaces for email in permute.subspace_combinator(subspace)) == Counter(emails)
+
+    # the batches reproduce the search order
+    assert [email for batch in permute.get_batches(200) for email in permute.batch_combinator(batch)] == emails
+
+
+@pytest.mark.parametrize("with_rules", [False, True])
+@pytest.mark.parametrize("mutator", MUTATORS[:3] + MUTATORS[4:])
+@pytest.mark.parametrize("crazy", [False, True])
+def test_exclude(crazy, mutator, with_rules, rules, domains_file):
+    rules = rules if with_rules else None
+    searched = Permute(["jo", "doe"], DOMAINS[:3], crazy, mutator, domains_file, rules)
+    # profile elements and domains merged later, one of them moved from the domains file
+    domains = ["naver.com", "new.org"] + DOMAINS
+    merged_file = domains_file.without(domains)
+    delta = Permute(["jo", "doe", "m", "x-y"], domains, crazy, mutator, merged_file, rules)
+    delta.exclude(searched)
+    full = Permute(["jo", "doe", "m", "x-y"], domains, crazy, mutator, merged_file, rules)
+
+    assert len(merged_file) == len(domains_file) - 1
+    delta_emails = list(delta.combinator())
+    assert len(delta_emails) == delta.get_combination_count()
+    assert Counter(delta_emails) + Counter(searched.combinator()) == Counter(full.combinator())
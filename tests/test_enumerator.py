@@ -0,0 +1,50 @@
+import asyncio
+import hashlib
+
+import pytest
+
+# the enumerator needs the runtime dependencies
+for module in ["httpx", "rich", "scrapling", "tldextract", "tqdm", "unidecode"]:
+    pytest.importorskip(module)
+
+from hashtray import enumerator  # noqa: E402
+from hashtray.permutator import Permute  # noqa: E402
+
+
+class ImmediateGravatar:
+    """
+    Gravatar returning the profile without waiting for the network.
+    """
+
+    def __init__(self, **kwargs):
+        pass
+
+    async def aggregate_gravatar_infos(self, sections=None) -> dict:
+        return {
+            "Preferred username": None,
+            "Display name": "John Doe",
+            "Verified accounts": None,
+            "Links": None,
+            "Emails": None,
+            "About me": None,
+        }
+
+
+def test_profile_merged_at_the_end_of_the_search(monkeypatch):
+    monkeypatch.setattr(enumerator, "Gravatar", ImmediateGravatar)
+    monkeypatch.setattr(enumerator.Confirm, "ask", lambda *args, **kwargs: False)
+    account_hash = hashlib.md5(b"john.doe@gmail.com").hexdigest()
+    e = enumerator.Enumerator(account_hash, strings=["x", "y", "zz"])
+    # a single yield to the event loop, at the end of the search of the provided elements:
+    # the profile arrives there, its done callback being scheduled after the search
+    total = Permute(["x", "y", "zz"], e.domains, rules=e.provider_rules).get_combination_count()
+    e.yield_interval = total - 1
+    found = []
+    monkeypatch.setattr(e, "learn", found.append)
+
+    asyncio.run(e.collect_elements())
+
+    assert found == ["john.doe@gmail.com"]
+    assert e.profile_merged
+    assert "john" in e.chunks
+    assert e.n > total